@@ -1,25 +1,57 @@
 """
 API routes para el asistente químico.
 """
+import hashlib
 import logging
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response
 
 logger = logging.getLogger(__name__)
 
 # Crear blueprint para las rutas de API
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
-# Variable global para el asistente (se inicializará desde app.py)
+# Variables globales para el asistente y el grafo (se inicializarán desde app.py)
 assistant = None
+knowledge_graph = None
 
+# Tiempo que los clientes pueden reutilizar las respuestas estructuradas
+STRUCTURED_MAX_AGE = 300
 
-def init_routes(chemical_assistant):
-    """Inicializa las rutas con la instancia del asistente."""
-    global assistant
+
+def init_routes(chemical_assistant, graph=None):
+    """Inicializa las rutas con la instancia del asistente y el grafo de conocimiento."""
+    global assistant, knowledge_graph
     assistant = chemical_assistant
+    knowledge_graph = graph
     logger.info("Rutas API inicializadas correctamente")
 
 
+def _cached_json(build_payload):
+    """
+    Responde con JSON cacheable (ETag + Cache-Control).
+
+    Solo las respuestas 200 llevan cabeceras de caché y admiten 304: el ETag
+    depende de la versión de database.json y de la URL. Los errores (404, etc.)
+    se devuelven sin cabeceras de caché.
+    """
+    payload, status = build_payload()
+    if status != 200:
+        return jsonify(payload), status
+
+    key = f"{knowledge_graph.version}:{request.full_path}"
+    etag = hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    # If-None-Match usa comparación débil (RFC 7232): W/"..." también vale
+    if request.if_none_match.contains_weak(etag):
+        response = make_response("", 304)
+    else:
+        response = jsonify(payload)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = STRUCTURED_MAX_AGE
+    return response
+
+
 @api_bp.route('/ask', methods=['POST'])
 def ask():
     """
@@ -63,7 +95,72 @@ def ask():
 @api_bp.route('/health', methods=['GET'])
 def health():
     """Endpoint de health check."""
+    cache = getattr(assistant, "embedding_cache", None)
     return jsonify({
         "status": "ok",
-        "assistant_ready": assistant is not None
+        "assistant_ready": assistant is not None,
+        "embedding_cache": cache.stats() if cache else None
     })
+
+
+@api_bp.route('/ingredients', methods=['GET'])
+def list_ingredients():
+    """
+    Lista los ingredientes del inventario.
+    
+    Query params opcionales:
+        category: categoría (p. ej. "limpieza")
+        toxicity: nivel de toxicidad (nula, baja, media, alta, muy alta, extrema
+                  o desconocida si no se pudo clasificar)
+    """
+    if not knowledge_graph:
+        return jsonify({"error": "El grafo de conocimiento no está disponible"}), 500
+
+    def build():
+        ids = knowledge_graph.find_ingredients(
+            category=request.args.get("category"),
+            toxicity=request.args.get("toxicity")
+        )
+        return {
+            "ingredients": [knowledge_graph.ingredient_summary(i) for i in ids]
+        }, 200
+
+    return _cached_json(build)
+
+
+@api_bp.route('/ingredients/<ing_id>', methods=['GET'])
+def get_ingredient(ing_id):
+    """Ficha de un ingrediente: recetas, incompatibilidades, reglas, NFPA y pH."""
+    if not knowledge_graph:
+        return jsonify({"error": "El grafo de conocimiento no está disponible"}), 500
+
+    def build():
+        if ing_id not in knowledge_graph.ingredients:
+            return {"error": f"Ingrediente no encontrado: {ing_id}"}, 404
+        return knowledge_graph.ingredient_detail(ing_id), 200
+
+    return _cached_json(build)
+
+
+@api_bp.route('/recipes', methods=['GET'])
+def list_recipes():
+    """
+    Lista recetas. Con ?uses=ing_001,ing_002 devuelve solo las que usan
+    todos los ingredientes indicados.
+    """
+    if not knowledge_graph:
+        return jsonify({"error": "El grafo de conocimiento no está disponible"}), 500
+
+    def build():
+        uses = [u.strip() for u in request.args.get("uses", "").split(",") if u.strip()]
+        unknown = [u for u in uses if u not in knowledge_graph.ingredients]
+        if unknown:
+            return {"error": f"Ingredientes no encontrados: {', '.join(unknown)}"}, 404
+        return {
+            "recipes": [
+                knowledge_graph.recipe_summary(r)
+                for r in knowledge_graph.recipes_using(uses)
+            ]
+        }, 200
+
+    return _cached_json(build)
@@ -16,6 +16,7 @@ if ROOT_DIR not in sys.path:
 
 from backend.core.config import AppConfig
 from backend.core.assistant import ChemicalAssistant
+from backend.core.loader import KnowledgeLoader
 from backend.api.routes import api_bp, init_routes
 
 # Configuración de logging
@@ -60,12 +61,15 @@ def create_app(config: AppConfig = None) -> Flask:
     # Configurar CORS
     CORS(app)
     
+    # Compilar el grafo de conocimiento para las consultas estructuradas
+    knowledge_graph = KnowledgeLoader.build_graph(config.DATA_FILE)
+    
     # Inicializar el asistente químico
     logger.info("Inicializando Chemical Assistant...")
     assistant = ChemicalAssistant(config)
     
-    # Inicializar rutas con el asistente
-    init_routes(assistant)
+    # Inicializar rutas con el asistente y el grafo
+    init_routes(assistant, knowledge_graph)
     
     # Registrar blueprints
     app.register_blueprint(api_bp)
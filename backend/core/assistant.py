@@ -12,6 +12,7 @@ from langchain_core.documents import Document
 from langchain_core.runnables import Runnable
 
 from backend.core.config import AppConfig
+from backend.core.embedding_cache import CachedEmbeddings
 from backend.core.loader import KnowledgeLoader
 
 logger = logging.getLogger(__name__)
@@ -23,6 +24,7 @@ class ChemicalAssistant:
     def __init__(self, config: AppConfig):
         self.config = config
         self.vector_db = None
+        self.embedding_cache: Optional[CachedEmbeddings] = None
         self.chain: Optional[Runnable] = None
         self._initialize()
 
@@ -37,11 +39,20 @@ class ChemicalAssistant:
         
         # Crear Embeddings y Vector Store
         logger.info(f"Cargando modelo de embeddings: {self.config.MODEL_NAME}")
-        embeddings = OllamaEmbeddings(
+        ollama_embeddings = OllamaEmbeddings(
             model=self.config.MODEL_NAME,
             base_url=self.config.OLLAMA_BASE_URL
         )
         
+        # Envolver con la caché persistente para no recalcular textos ya vistos
+        embeddings = CachedEmbeddings(
+            ollama_embeddings,
+            model_name=self.config.MODEL_NAME,
+            path=self.config.EMBEDDING_CACHE_PATH,
+            max_entries=self.config.EMBEDDING_CACHE_MAX_ENTRIES
+        )
+        self.embedding_cache = embeddings
+        
         # Intentar cargar vector store desde caché
         if docs:
             if os.path.exists(self.config.VECTOR_STORE_PATH):
@@ -66,6 +77,7 @@ class ChemicalAssistant:
                 logger.info("Guardando vector store en caché...")
                 self.vector_db.save_local(self.config.VECTOR_STORE_PATH)
                 logger.info("✅ Vector store creado y guardado en caché.")
+                logger.info(f"Caché de embeddings: {embeddings.stats()}")
             
             retriever = self.vector_db.as_retriever(search_kwargs={"k": 8})
         else:
@@ -19,6 +19,10 @@ class AppConfig:
     DATA_DIR: str = os.path.join(BASE_DIR, "data")
     DATA_FILE: str = os.path.join(DATA_DIR, "database.json")
     VECTOR_STORE_PATH: str = os.path.join(DATA_DIR, "vector_store")
+    EMBEDDING_CACHE_PATH: str = os.path.join(DATA_DIR, "embedding_cache.sqlite3")
+    
+    # Caché de embeddings
+    EMBEDDING_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
     
     # Configuración del servidor
     HOST: str = os.getenv("FLASK_HOST", "0.0.0.0")
@@ -0,0 +1,362 @@
+"""
+Caché persistente de embeddings direccionada por contenido.
+"""
+import atexit
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+import weakref
+from array import array
+from typing import Callable, Dict, List, Optional, Sequence
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Límite conservador de parámetros por sentencia SQLite
+_SQL_BATCH = 500
+
+# Espera máxima (segundos) por el bloqueo de escritura antes de rendirse
+_SQL_TIMEOUT = 5
+
+# Los usos (LRU) anotados en memoria se vuelcan sin esperar al bloqueo de
+# escritura cuando se acumulan tantos o pasa este tiempo desde el último volcado
+_TOUCH_FLUSH_BATCH = 256
+_TOUCH_FLUSH_INTERVAL = 60
+
+# Tipos de embedding: una consulta puede no tener el mismo vector que un documento
+_KIND_DOCUMENT = "document"
+_KIND_QUERY = "query"
+
+
+def _flush_at_exit(ref: "weakref.ReferenceType"):
+    cache = ref()
+    if cache is not None:
+        cache.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Envuelve un objeto de embeddings y guarda cada vector en disco.
+
+    La clave es (modelo, sha256 del tipo y el texto normalizado), de modo que
+    el mismo texto nunca se vuelve a enviar a Ollama, aunque se reconstruya el
+    índice o se reinicie el proceso. Documentos y consultas se guardan por
+    separado. Los vectores se guardan como float32 en una base SQLite en modo
+    WAL, que admite lectores concurrentes desde varios procesos mientras otro
+    escribe.
+
+    Cada hilo usa su propia conexión y el lock interno solo protege el estado
+    en memoria, así que un acierto nunca espera a una escritura pendiente. El
+    último uso (LRU) de los aciertos se anota en memoria y se vuelca en la
+    siguiente escritura, por lotes sin bloquear o al cerrar el proceso.
+    max_entries se aplica por modelo. Cualquier error de SQLite se registra y
+    se recurre directamente a los embeddings envueltos; la caché nunca hace
+    fallar al asistente.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        path: str,
+        max_entries: int = 50000,
+        timeout: float = _SQL_TIMEOUT,
+    ):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._touched: Dict[str, float] = {}
+        self._last_flush = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._enabled = True
+        try:
+            self._init_schema(self._connection())
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Caché de embeddings deshabilitada ({path}): {e}")
+            self._enabled = False
+        else:
+            atexit.register(_flush_at_exit, weakref.ref(self))
+
+    def _connection(self) -> sqlite3.Connection:
+        """Devuelve la conexión del hilo actual, abriéndola si hace falta."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _init_schema(self, conn: sqlite3.Connection):
+        """Activa WAL y crea el esquema si no existe."""
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " dim INTEGER NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_model_last_used "
+            "ON embeddings (model, last_used)"
+        )
+        # Contador de entradas por modelo, actualizado en la misma transacción
+        # que las inserciones y expulsiones para no recorrer la tabla.
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entry_counts ("
+            " model TEXT PRIMARY KEY,"
+            " entries INTEGER NOT NULL)"
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO entry_counts (model, entries) "
+            "SELECT ?, COUNT(*) FROM embeddings WHERE model = ?",
+            (self.model_name, self.model_name),
+        )
+        conn.commit()
+
+    @staticmethod
+    def _hash_text(text: str, kind: str = _KIND_DOCUMENT) -> str:
+        """Calcula el hash del tipo y el texto normalizado (NFC, sin espacios en los extremos)."""
+        normalized = unicodedata.normalize("NFC", text).strip()
+        return hashlib.sha256(f"{kind}\0{normalized}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _encode(vector: Sequence[float]) -> bytes:
+        return array("f", vector).tobytes()
+
+    @staticmethod
+    def _decode(blob: bytes) -> List[float]:
+        values = array("f")
+        values.frombytes(blob)
+        return values.tolist()
+
+    def _lookup(self, hashes: List[str]) -> Dict[str, List[float]]:
+        """Busca en disco los vectores de los hashes dados (solo lectura)."""
+        if not self._enabled:
+            return {}
+
+        found = {}
+        try:
+            conn = self._connection()
+            for start in range(0, len(hashes), _SQL_BATCH):
+                chunk = hashes[start:start + _SQL_BATCH]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [self.model_name, *chunk],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = self._decode(blob)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Error leyendo la caché de embeddings: {e}")
+            return {}
+
+        if found:
+            now = time.time()
+            with self._lock:
+                for text_hash in found:
+                    self._touched[text_hash] = now
+                due = (
+                    len(self._touched) >= _TOUCH_FLUSH_BATCH
+                    or now - self._last_flush >= _TOUCH_FLUSH_INTERVAL
+                )
+            if due:
+                self.flush_touches(blocking=False)
+        return found
+
+    def _take_touches(self) -> Dict[str, float]:
+        """Extrae los usos pendientes para escribirlos."""
+        with self._lock:
+            touched = self._touched
+            self._touched = {}
+            self._last_flush = time.time()
+        return touched
+
+    def _restore_touches(self, touched: Dict[str, float]):
+        """Devuelve a memoria los usos que no se pudieron escribir."""
+        with self._lock:
+            for text_hash, used in touched.items():
+                if used > self._touched.get(text_hash, 0):
+                    self._touched[text_hash] = used
+
+    def _write_touches(self, conn: sqlite3.Connection, touched: Dict[str, float]):
+        conn.executemany(
+            "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+            [(used, self.model_name, h) for h, used in touched.items()],
+        )
+
+    def flush_touches(self, blocking: bool = True):
+        """
+        Escribe en disco los usos pendientes. Con blocking=False no espera al
+        bloqueo de escritura: si otro proceso lo tiene, se reintentará más tarde.
+        """
+        if not self._enabled:
+            return
+        touched = self._take_touches()
+        if not touched:
+            return
+
+        try:
+            conn = self._connection()
+            if not blocking:
+                conn.execute("PRAGMA busy_timeout = 0")
+            try:
+                with conn:
+                    self._write_touches(conn, touched)
+            finally:
+                if not blocking:
+                    conn.execute(f"PRAGMA busy_timeout = {int(self.timeout * 1000)}")
+        except (sqlite3.Error, OSError) as e:
+            self._restore_touches(touched)
+            if blocking:
+                logger.warning(f"Error escribiendo la caché de embeddings: {e}")
+
+    def _store(self, vectors: Dict[str, List[float]]):
+        """Guarda vectores nuevos, vuelca los usos pendientes y aplica la expulsión LRU."""
+        if not self._enabled:
+            return
+
+        now = time.time()
+        touched = self._take_touches()
+        try:
+            conn = self._connection()
+            with conn:
+                self._write_touches(conn, touched)
+                inserted = conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings "
+                    "(model, text_hash, dim, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (self.model_name, h, len(v), self._encode(v), now)
+                        for h, v in vectors.items()
+                    ],
+                ).rowcount
+                self._add_entries(conn, inserted)
+                self._evict(conn)
+        except (sqlite3.Error, OSError) as e:
+            self._restore_touches(touched)
+            logger.warning(f"Error escribiendo la caché de embeddings: {e}")
+
+    def _add_entries(self, conn: sqlite3.Connection, delta: int):
+        """Ajusta el contador de entradas del modelo actual."""
+        if delta:
+            conn.execute(
+                "UPDATE entry_counts SET entries = entries + ? WHERE model = ?",
+                (delta, self.model_name),
+            )
+
+    def _count_entries(self, conn: sqlite3.Connection) -> int:
+        """Número de entradas del modelo actual (desde el contador, sin recorrer la tabla)."""
+        row = conn.execute(
+            "SELECT entries FROM entry_counts WHERE model = ?", (self.model_name,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Elimina las entradas del modelo usadas hace más tiempo si se supera max_entries."""
+        if not self.max_entries or self.max_entries <= 0:
+            return
+        excess = self._count_entries(conn) - self.max_entries
+        if excess > 0:
+            deleted = conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN ("
+                " SELECT rowid FROM embeddings WHERE model = ?"
+                " ORDER BY last_used ASC LIMIT ?)",
+                (self.model_name, excess),
+            ).rowcount
+            self._add_entries(conn, -deleted)
+            logger.info(f"Caché de embeddings: {deleted} entradas expulsadas.")
+
+    def _embed(
+        self,
+        texts: List[str],
+        kind: str,
+        compute: Callable[[List[str]], List[List[float]]],
+    ) -> List[List[float]]:
+        """Devuelve los vectores de la caché y calcula con `compute` los que faltan."""
+        hashes = [self._hash_text(t, kind) for t in texts]
+        cached = self._lookup(list(dict.fromkeys(hashes)))
+
+        # Textos pendientes, sin duplicados y en orden de aparición
+        pending: Dict[str, str] = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in cached and text_hash not in pending:
+                pending[text_hash] = text
+
+        misses = sum(1 for h in hashes if h not in cached)
+        with self._lock:
+            self.hits += len(texts) - misses
+            self.misses += misses
+
+        if pending:
+            new_vectors = compute(list(pending.values()))
+            computed = dict(zip(pending.keys(), new_vectors))
+            self._store(computed)
+            cached.update(computed)
+
+        return [cached[h] for h in hashes]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Devuelve los embeddings de los textos, calculando solo los que faltan."""
+        return self._embed(texts, _KIND_DOCUMENT, self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Devuelve el embedding de una consulta (clave separada de los documentos)."""
+        return self._embed(
+            [text], _KIND_QUERY, lambda pending: [self.embeddings.embed_query(pending[0])]
+        )[0]
+
+    def close(self):
+        """Vuelca los usos pendientes y cierra las conexiones abiertas."""
+        if not self._enabled:
+            return
+        self.flush_touches(blocking=True)
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+        self._enabled = False
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """
+        Estadísticas de la caché: aciertos y fallos de este proceso, y entradas
+        en disco del modelo actual (el mismo alcance al que se aplica max_entries).
+        """
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        entries = None
+        if self._enabled:
+            try:
+                entries = self._count_entries(self._connection())
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"Error leyendo la caché de embeddings: {e}")
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else None,
+            "entries": entries,
+            "max_entries": self.max_entries,
+        }
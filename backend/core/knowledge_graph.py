@@ -0,0 +1,243 @@
+"""
+Grafo de conocimiento precalculado de ingredientes, recetas y reglas de seguridad.
+"""
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Formato de los IDs de ingredientes del inventario
+ING_ID_PATTERN = re.compile(r"^ing_\d{3}$")
+
+# Niveles de toxicidad reconocidos, de menor a mayor gravedad. Lo que no
+# empieza por ninguno de ellos es "desconocida".
+TOXICITY_LEVELS = ("nula", "baja", "media", "alta", "muy alta", "extrema")
+
+# Orden de comparación por prefijo: "muy alta" antes que "alta"
+_TOXICITY_PREFIXES = sorted(TOXICITY_LEVELS, key=len, reverse=True)
+
+
+def _normalize_key(value: str) -> str:
+    """Normaliza un texto para usarlo como clave de índice (minúsculas, sin acentos)."""
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+
+def _category_keys(categoria: str) -> List[str]:
+    """'Limpieza (Desinfección) / Cuidado Personal' -> ['limpieza', 'cuidado personal']."""
+    sin_parentesis = re.sub(r"\(.*?\)", "", categoria or "")
+    return [k for k in (_normalize_key(p) for p in sin_parentesis.split("/")) if k]
+
+
+def _toxicity_keys(toxicidad: str) -> List[str]:
+    """
+    'Media (Humanos) / Alta (Gatos)' -> ['media', 'alta'].
+
+    Cada parte separada por '/' se clasifica por separado para no perder el
+    nivel más grave. Devuelve ['desconocida'] si no se reconoce ninguna.
+    """
+    sin_parentesis = re.sub(r"\(.*?\)", "", toxicidad or "")
+    niveles = []
+    for parte in sin_parentesis.split("/"):
+        texto = _normalize_key(parte)
+        nivel = next((n for n in _TOXICITY_PREFIXES if texto.startswith(n)), None)
+        if nivel and nivel not in niveles:
+            niveles.append(nivel)
+    return niveles or ["desconocida"]
+
+
+def _most_severe(niveles: List[str]) -> str:
+    """Nivel más grave de la lista ('desconocida' si no hay niveles reconocidos)."""
+    conocidos = [n for n in niveles if n in TOXICITY_LEVELS]
+    return max(conocidos, key=TOXICITY_LEVELS.index) if conocidos else "desconocida"
+
+
+@dataclass
+class KnowledgeGraph:
+    """
+    Vista estructurada de database.json para consultas sin LLM.
+
+    Se construye una sola vez al arrancar la aplicación; todas las respuestas
+    de los endpoints de lectura se sirven desde estos diccionarios.
+    """
+
+    version: str = ""
+    ingredients: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    recipes: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    guardrails: List[Dict[str, Any]] = field(default_factory=list)
+    ingredient_recipes: Dict[str, List[str]] = field(default_factory=dict)
+    ingredient_guardrails: Dict[str, List[int]] = field(default_factory=dict)
+    incompatibilities: Dict[str, Dict[str, Optional[str]]] = field(default_factory=dict)
+    by_category: Dict[str, List[str]] = field(default_factory=dict)
+    by_toxicity: Dict[str, List[str]] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_data(cls, datos: Dict[str, Any], version: str = "") -> "KnowledgeGraph":
+        """Compila el contenido de database.json en índices en memoria."""
+        graph = cls(version=version)
+
+        # 1. Nodos de ingredientes
+        for item in datos.get("inventario_quimico", []):
+            ing_id = item.get("id")
+            if not ing_id:
+                graph.errors.append("Ingrediente sin 'id' en el inventario.")
+                continue
+            if ing_id in graph.ingredients:
+                graph.errors.append(f"ID de ingrediente duplicado: {ing_id}")
+                continue
+            graph.ingredients[ing_id] = item
+            graph.ingredient_recipes[ing_id] = []
+            graph.ingredient_guardrails[ing_id] = []
+            graph.incompatibilities[ing_id] = {}
+
+            for key in _category_keys(item.get("categoria", "")):
+                graph.by_category.setdefault(key, []).append(ing_id)
+            toxicidad = item.get("seguridad", {}).get("toxicidad", "")
+            for nivel in _toxicity_keys(toxicidad):
+                graph.by_toxicity.setdefault(nivel, []).append(ing_id)
+
+        # 2. Incompatibilidades declaradas en cada ingrediente (aristas simétricas)
+        for ing_id, item in graph.ingredients.items():
+            for inc in item.get("seguridad", {}).get("incompatible_con", []):
+                parts = inc.split(" (", 1)
+                nota = parts[1].rstrip(")") if len(parts) > 1 else None
+                if graph._check_ref(parts[0], f"incompatible_con de {ing_id}"):
+                    graph._add_incompatibility(ing_id, parts[0], nota)
+
+        # 3. Recetas
+        for receta in datos.get("recetas_sugeridas", []):
+            rec_id = receta.get("id_receta") or receta.get("nombre")
+            graph.recipes[rec_id] = receta
+            for ing in receta.get("ingredientes", []):
+                ing_id = ing.get("id") or ing.get("chem_id")
+                if graph._check_ref(ing_id, f"receta {rec_id}"):
+                    if rec_id not in graph.ingredient_recipes[ing_id]:
+                        graph.ingredient_recipes[ing_id].append(rec_id)
+
+        # 4. Reglas de seguridad (también generan aristas de incompatibilidad)
+        for index, regla in enumerate(datos.get("reglas_prohibidas_guardrails", [])):
+            graph.guardrails.append(regla)
+            if "reactivos" in regla:
+                reactivos = list(regla["reactivos"])
+            else:
+                reactivos = [regla.get("ingrediente_A"), regla.get("ingrediente_B")]
+
+            validos = [r for r in reactivos if graph._check_ref(r, f"regla #{index}")]
+            for ing_id in validos:
+                graph.ingredient_guardrails[ing_id].append(index)
+            for i, a in enumerate(validos):
+                for b in validos[i + 1:]:
+                    graph._add_incompatibility(a, b, regla.get("resultado"))
+
+        for error in graph.errors:
+            logger.warning(f"Integridad de la base de conocimiento: {error}")
+        logger.info(
+            f"Grafo de conocimiento: {len(graph.ingredients)} ingredientes, "
+            f"{len(graph.recipes)} recetas, {len(graph.guardrails)} reglas."
+        )
+        return graph
+
+    def _check_ref(self, ref: Optional[str], origen: str) -> bool:
+        """
+        Indica si la referencia apunta a un ingrediente del inventario.
+
+        Las referencias con formato ing_XXX que no existen se registran como
+        error de integridad; otras (p. ej. 'agua') se ignoran sin error.
+        """
+        if ref in self.ingredients:
+            return True
+        if ref and ING_ID_PATTERN.match(ref):
+            self.errors.append(f"Referencia a ingrediente inexistente {ref} en {origen}")
+        return False
+
+    def _add_incompatibility(self, a: str, b: str, nota: Optional[str]):
+        """Añade la arista a<->b conservando la primera nota no vacía."""
+        if a == b:
+            return
+        for x, y in ((a, b), (b, a)):
+            if not self.incompatibilities[x].get(y):
+                self.incompatibilities[x][y] = nota
+
+    def name_of(self, ing_id: str) -> str:
+        """Nombre principal de un ingrediente (o su ID si no tiene nombres)."""
+        nombres = self.ingredients.get(ing_id, {}).get("nombres", [])
+        return nombres[0] if nombres else ing_id
+
+    def ingredient_summary(self, ing_id: str) -> Dict[str, Any]:
+        """Resumen corto de un ingrediente para listados."""
+        item = self.ingredients[ing_id]
+        toxicidad = item.get("seguridad", {}).get("toxicidad")
+        niveles = _toxicity_keys(toxicidad or "")
+        return {
+            "id": ing_id,
+            "nombre": self.name_of(ing_id),
+            "categoria": item.get("categoria"),
+            "toxicidad": toxicidad,
+            "nivel_toxicidad": _most_severe(niveles),
+            "niveles_toxicidad": niveles,
+        }
+
+    def ingredient_detail(self, ing_id: str) -> Dict[str, Any]:
+        """Ficha estructurada completa de un ingrediente."""
+        item = self.ingredients[ing_id]
+        seguridad = item.get("seguridad", {})
+        detail = self.ingredient_summary(ing_id)
+        detail.update({
+            "nombres": item.get("nombres", []),
+            "descripcion": item.get("descripcion"),
+            "ph": item.get("ph"),
+            "rango_ph_preciso": item.get("rango_ph_preciso"),
+            "nfpa_704": item.get("nfpa_704"),
+            "formula_quimica": item.get("formula_quimica"),
+            "cas_number": item.get("cas_number"),
+            "advertencia_critica": seguridad.get("advertencia_critica"),
+            "usos_comunes": item.get("usos_comunes", []),
+            "incompatible_con": [
+                {"id": other, "nombre": self.name_of(other), "nota": nota}
+                for other, nota in sorted(self.incompatibilities[ing_id].items())
+            ],
+            "recetas": [self.recipe_summary(r) for r in self.ingredient_recipes[ing_id]],
+            "reglas_seguridad": [self.guardrails[i] for i in self.ingredient_guardrails[ing_id]],
+        })
+        return detail
+
+    def recipe_summary(self, rec_id: str) -> Dict[str, Any]:
+        """Resumen de una receta con los nombres de sus ingredientes resueltos."""
+        receta = self.recipes[rec_id]
+        ingredientes = []
+        for ing in receta.get("ingredientes", []):
+            ing_id = ing.get("id") or ing.get("chem_id")
+            ingredientes.append({
+                "id": ing_id,
+                "nombre": self.name_of(ing_id),
+                "cantidad": ing.get("cantidad"),
+            })
+        return {
+            "id": rec_id,
+            "nombre": receta.get("nombre"),
+            "categoria": receta.get("categoria"),
+            "ingredientes": ingredientes,
+        }
+
+    def find_ingredients(self, category: str = None, toxicity: str = None) -> List[str]:
+        """IDs de ingredientes filtrados por categoría y/o nivel de toxicidad."""
+        ids: Set[str] = set(self.ingredients)
+        if category:
+            ids &= set(self.by_category.get(_normalize_key(category), []))
+        if toxicity:
+            ids &= set(self.by_toxicity.get(_normalize_key(toxicity), []))
+        return [i for i in self.ingredients if i in ids]
+
+    def recipes_using(self, ing_ids: List[str]) -> List[str]:
+        """IDs de recetas que usan todos los ingredientes indicados."""
+        result: Optional[Set[str]] = None
+        for ing_id in ing_ids:
+            usadas = set(self.ingredient_recipes.get(ing_id, []))
+            result = usadas if result is None else result & usadas
+        if result is None:
+            return list(self.recipes)
+        return [r for r in self.recipes if r in result]
@@ -1,13 +1,16 @@
 """
 Cargador de base de conocimientos desde archivos JSON.
 """
+import hashlib
 import json
 import os
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 from langchain_core.documents import Document
 
+from backend.core.knowledge_graph import KnowledgeGraph
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,17 +18,32 @@ class KnowledgeLoader:
     """Encargado de cargar y procesar la base de conocimientos."""
     
     @staticmethod
-    def load_from_json(file_path: str) -> List[Document]:
-        """Carga datos desde JSON y los convierte a documentos LangChain."""
+    def _read_json(file_path: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Lee el JSON y devuelve (datos, hash sha256 del contenido)."""
         if not os.path.exists(file_path):
             logger.error(f"No se encontró el archivo: {file_path}")
-            return []
+            return None, ""
 
+        with open(file_path, 'rb') as f:
+            raw = f.read()
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                datos = json.load(f)
-        except json.JSONDecodeError:
+            datos = json.loads(raw.decode('utf-8'))
+        except (json.JSONDecodeError, UnicodeDecodeError):
             logger.error(f"El archivo {file_path} no es un JSON válido.")
+            return None, ""
+        return datos, hashlib.sha256(raw).hexdigest()
+
+    @staticmethod
+    def build_graph(file_path: str) -> KnowledgeGraph:
+        """Compila el JSON en un grafo de conocimiento para consultas estructuradas."""
+        datos, version = KnowledgeLoader._read_json(file_path)
+        return KnowledgeGraph.from_data(datos or {}, version=version)
+
+    @staticmethod
+    def load_from_json(file_path: str) -> List[Document]:
+        """Carga datos desde JSON y los convierte a documentos LangChain."""
+        datos, _ = KnowledgeLoader._read_json(file_path)
+        if datos is None:
             return []
             
         documentos = []
@@ -0,0 +1,164 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.embeddings import Embeddings
+
+from backend.core import embedding_cache
+from backend.core.embedding_cache import CachedEmbeddings
+
+
+class FakeEmbeddings(Embeddings):
+    """Embeddings deterministas que cuentan cuántos textos se calculan."""
+
+    def __init__(self):
+        self.calls = 0
+        self.query_calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return [[float(len(t)), 0.5, -1.0] for t in texts]
+
+    def embed_query(self, text):
+        # Vector distinto al de documento, como en modelos asimétricos
+        self.query_calls += 1
+        return [float(len(text)), -0.5, 1.0]
+
+
+def _last_used(path, cache, text, kind="query"):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(
+            "SELECT last_used FROM embeddings WHERE text_hash = ?",
+            (cache._hash_text(text, kind),),
+        ).fetchone()[0]
+
+
+def test_rebuild_makes_no_embedding_calls():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.sqlite3")
+        texts = ["Vinagre Blanco", "Bicarbonato", "Vinagre Blanco"]
+
+        first = FakeEmbeddings()
+        cache = CachedEmbeddings(first, "test-model", path)
+        vectors = cache.embed_documents(texts)
+        query = cache.embed_query("Bicarbonato")
+        assert first.calls == 2
+        assert first.query_calls == 1
+        assert vectors[0] == vectors[2] == [14.0, 0.5, -1.0]
+        # La consulta no reutiliza el vector de documento
+        assert query == [11.0, -0.5, 1.0]
+        cache.close()
+
+        # Nuevo proceso / reconstrucción: todo sale de disco
+        second = FakeEmbeddings()
+        cache = CachedEmbeddings(second, "test-model", path)
+        assert cache.embed_documents(texts) == vectors
+        assert cache.embed_query("  Bicarbonato ") == query
+        assert second.calls == 0
+        assert second.query_calls == 0
+        assert cache.stats()["hit_rate"] == 1.0
+
+        # Otro modelo no comparte vectores
+        other = FakeEmbeddings()
+        CachedEmbeddings(other, "otro-modelo", path).embed_documents(texts)
+        assert other.calls == 2
+
+
+def test_eviction_keeps_most_recent_entries():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.sqlite3")
+        cache = CachedEmbeddings(FakeEmbeddings(), "test-model", path, max_entries=2)
+        cache.embed_query("a")
+        time.sleep(0.01)
+        cache.embed_query("bb")
+        time.sleep(0.01)
+        cache.embed_query("a")  # acierto: "a" pasa a ser la más reciente
+        time.sleep(0.01)
+        cache.embed_query("ccc")  # expulsa "bb", la menos usada
+        assert cache.stats()["entries"] == 2
+
+        fresh = FakeEmbeddings()
+        reopened = CachedEmbeddings(fresh, "test-model", path, max_entries=2)
+        reopened.embed_query("a")
+        assert fresh.query_calls == 0
+        reopened.embed_query("bb")
+        assert fresh.query_calls == 1
+
+
+def test_hits_do_not_wait_for_blocked_miss():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.sqlite3")
+        cache = CachedEmbeddings(FakeEmbeddings(), "test-model", path, timeout=1)
+        cache.embed_query("x")
+
+        # Otro proceso mantiene el bloqueo de escritura
+        writer = sqlite3.connect(path)
+        writer.execute("BEGIN IMMEDIATE")
+        try:
+            miss_result = []
+            miss = threading.Thread(target=lambda: miss_result.append(cache.embed_query("yy")))
+            miss.start()
+            time.sleep(0.1)  # el fallo ya está esperando el bloqueo
+
+            start = time.time()
+            assert cache.embed_query("x") == [1.0, -0.5, 1.0]
+            assert time.time() - start < 0.3
+            assert miss.is_alive()
+
+            miss.join()
+            # El fallo no pudo escribir, pero igualmente devuelve el vector
+            assert miss_result == [[2.0, -0.5, 1.0]]
+        finally:
+            writer.rollback()
+            writer.close()
+
+
+def test_touches_are_flushed_without_misses():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.sqlite3")
+        cache = CachedEmbeddings(FakeEmbeddings(), "test-model", path)
+        cache.embed_query("a")
+        stored = _last_used(path, cache, "a")
+
+        # Solo aciertos: al cerrar se escriben los usos pendientes
+        time.sleep(0.01)
+        cache.embed_query("a")
+        cache.close()
+        assert _last_used(path, cache, "a") > stored
+
+        # Por lotes: se vuelca sin esperar a un fallo
+        original = embedding_cache._TOUCH_FLUSH_BATCH
+        embedding_cache._TOUCH_FLUSH_BATCH = 1
+        try:
+            cache = CachedEmbeddings(FakeEmbeddings(), "test-model", path)
+            stored = _last_used(path, cache, "a")
+            time.sleep(0.01)
+            cache.embed_query("a")
+            assert _last_used(path, cache, "a") > stored
+        finally:
+            embedding_cache._TOUCH_FLUSH_BATCH = original
+
+
+def test_unusable_cache_falls_back_to_embeddings():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Una carpeta no es una base SQLite válida
+        fake = FakeEmbeddings()
+        cache = CachedEmbeddings(fake, "test-model", tmp)
+        assert cache.embed_documents(["a", "bb"]) == [[1.0, 0.5, -1.0], [2.0, 0.5, -1.0]]
+        assert fake.calls == 2
+        assert cache.stats()["entries"] is None
+
+
+if __name__ == "__main__":
+    test_rebuild_makes_no_embedding_calls()
+    test_eviction_keeps_most_recent_entries()
+    test_hits_do_not_wait_for_blocked_miss()
+    test_touches_are_flushed_without_misses()
+    test_unusable_cache_falls_back_to_embeddings()
+    print("✅ Caché de embeddings OK")
@@ -0,0 +1,150 @@
+import json
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from backend.api.routes import api_bp, init_routes
+from backend.core.config import AppConfig
+from backend.core.knowledge_graph import KnowledgeGraph
+
+
+def _sample_data():
+    return {
+        "inventario_quimico": [
+            {"id": "ing_001", "nombres": ["Vinagre"], "categoria": "Limpieza",
+             "seguridad": {"toxicidad": "Baja", "incompatible_con": ["ing_003"]}},
+            {"id": "ing_002", "nombres": ["Bicarbonato"], "categoria": "Limpieza / Cuidado Personal",
+             "seguridad": {"toxicidad": "Nula", "incompatible_con": ["ing_001 (Se neutralizan)"]}},
+            {"id": "ing_003", "nombres": ["Lejía"], "categoria": "Limpieza (Desinfección)",
+             "seguridad": {"toxicidad": "Alta", "incompatible_con": ["ing_099"]}},
+            {"id": "ing_004", "nombres": ["Aceite de Árbol de Té"], "categoria": "Aceite Esencial",
+             "seguridad": {"toxicidad": "Media (Humanos) / Alta (Gatos)"}},
+            {"id": "ing_005", "nombres": ["Parabenos"], "categoria": "Conservante",
+             "seguridad": {"toxicidad": "Controvertida (Disruptor endocrino potencial)"}},
+        ],
+        "recetas_sugeridas": [
+            {"id_receta": "rec_001", "nombre": "Multiusos",
+             "ingredientes": [{"id": "ing_001"}, {"id": "agua"}]},
+            {"id_receta": "rec_002", "nombre": "Pasta",
+             "ingredientes": [{"id": "ing_001"}, {"id": "ing_002"}]},
+        ],
+        "reglas_prohibidas_guardrails": [
+            {"ingrediente_A": "ing_003", "ingrediente_B": "ing_002", "resultado": "Gas"},
+            {"ingrediente_A": "ing_001", "ingrediente_B": "PIEL_DIRECTA", "resultado": "Irritación"},
+        ],
+    }
+
+
+def test_graph_indexes():
+    graph = KnowledgeGraph.from_data(_sample_data(), version="v1")
+
+    # Aristas simétricas desde incompatible_con y desde las reglas
+    assert set(graph.incompatibilities["ing_003"]) == {"ing_001", "ing_002"}
+    assert graph.incompatibilities["ing_001"]["ing_002"] == "Se neutralizan"
+    assert graph.ingredient_guardrails["ing_001"] == [1]
+
+    assert graph.recipes_using(["ing_001"]) == ["rec_001", "rec_002"]
+    assert graph.recipes_using(["ing_001", "ing_002"]) == ["rec_002"]
+    assert graph.find_ingredients(category="cuidado personal") == ["ing_002"]
+    assert graph.find_ingredients(category="limpieza", toxicity="alta") == ["ing_003"]
+
+    # Toxicidad con varios niveles: se indexa en todos y se informa el más grave
+    assert graph.find_ingredients(toxicity="alta") == ["ing_003", "ing_004"]
+    assert graph.find_ingredients(toxicity="media") == ["ing_004"]
+    assert graph.find_ingredients(toxicity="desconocida") == ["ing_005"]
+    summary = graph.ingredient_summary("ing_004")
+    assert summary["nivel_toxicidad"] == "alta"
+    assert summary["niveles_toxicidad"] == ["media", "alta"]
+
+    # Integridad: ing_099 no existe, 'agua' y 'PIEL_DIRECTA' no son IDs de inventario
+    assert graph.errors == ["Referencia a ingrediente inexistente ing_099 en incompatible_con de ing_003"]
+
+
+def test_graph_from_database():
+    config = AppConfig()
+    with open(config.DATA_FILE, "r", encoding="utf-8") as f:
+        graph = KnowledgeGraph.from_data(json.load(f))
+
+    detail = graph.ingredient_detail("ing_003")
+    assert any(inc["id"] == "ing_001" for inc in detail["incompatible_con"])
+    assert all(
+        "ing_003" in graph.incompatibilities[other]
+        for other in graph.incompatibilities["ing_003"]
+    )
+
+
+def _client():
+    """Cliente Flask con solo el grafo de ejemplo (sin asistente ni Ollama)."""
+    init_routes(None, KnowledgeGraph.from_data(_sample_data(), version="v1"))
+    app = Flask(__name__)
+    app.register_blueprint(api_bp)
+    return app.test_client()
+
+
+def test_ingredients_endpoints():
+    client = _client()
+
+    response = client.get("/api/ingredients?category=limpieza&toxicity=alta")
+    assert response.status_code == 200
+    assert [i["id"] for i in response.get_json()["ingredients"]] == ["ing_003"]
+
+    response = client.get("/api/ingredients/ing_001")
+    assert response.status_code == 200
+    detail = response.get_json()
+    assert [r["id"] for r in detail["recetas"]] == ["rec_001", "rec_002"]
+    assert {i["id"] for i in detail["incompatible_con"]} == {"ing_002", "ing_003"}
+
+
+def test_recipes_uses_filter():
+    client = _client()
+
+    response = client.get("/api/recipes?uses=ing_001,ing_002")
+    assert response.status_code == 200
+    assert [r["id"] for r in response.get_json()["recipes"]] == ["rec_002"]
+
+    response = client.get("/api/recipes")
+    assert [r["id"] for r in response.get_json()["recipes"]] == ["rec_001", "rec_002"]
+
+
+def test_etag_round_trip():
+    client = _client()
+
+    first = client.get("/api/ingredients/ing_001")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"]
+
+    second = client.get("/api/ingredients/ing_001", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["ETag"] == etag
+
+    # Comparación débil: un proxy puede reenviar el ETag como W/"..."
+    weak = client.get("/api/ingredients/ing_001", headers={"If-None-Match": f"W/{etag}"})
+    assert weak.status_code == 304
+
+    # Otra URL, otro ETag
+    other = client.get("/api/ingredients/ing_002", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+def test_errors_are_not_cached():
+    client = _client()
+
+    for url in ("/api/ingredients/ing_999", "/api/recipes?uses=agua"):
+        response = client.get(url, headers={"If-None-Match": "*"})
+        assert response.status_code == 404
+        assert "ETag" not in response.headers
+        assert "Cache-Control" not in response.headers
+
+
+if __name__ == "__main__":
+    test_graph_indexes()
+    test_graph_from_database()
+    test_ingredients_endpoints()
+    test_recipes_uses_filter()
+    test_etag_round_trip()
+    test_errors_are_not_cached()